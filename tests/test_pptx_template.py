@@ -0,0 +1,79 @@
+"""
+Regression tests for the PowerPoint template fill used by the certificate tools
+"""
+
+import os
+import sys
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("pptx")
+
+from pptx import Presentation
+from pptx.util import Inches
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+
+from _pptx_template import modify_pptx_template
+
+
+def _make_template(*texts: str) -> BytesIO:
+    """Build a one-slide deck with a text box per text."""
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    for i, text in enumerate(texts):
+        box = slide.shapes.add_textbox(Inches(1), Inches(1 + i), Inches(6), Inches(1))
+        box.text_frame.text = text
+
+    stream = BytesIO()
+    prs.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def _slide_texts(content: bytes) -> list:
+    """Reopen a generated deck and return the text of every shape."""
+    prs = Presentation(BytesIO(content))
+    return [shape.text_frame.text for shape in prs.slides[0].shapes]
+
+
+def test_zip_path_replaces_placeholders():
+    template = _make_template("Issued to <Company>", "<Tier>", "Valid through 31 December 2020")
+
+    content = modify_pptx_template(template, "Acme & Co", "Gold", 2026)
+
+    assert _slide_texts(content) == ["Issued to Acme & Co", "Gold", "Valid through 31 December 2026"]
+
+
+def test_fallback_path_replaces_placeholders():
+    # No <Tier> in the template, so the zip path hands over to python-pptx
+    template = _make_template("Issued to <Company>", "Valid through 31 December 2020")
+
+    content = modify_pptx_template(template, "Acme & Co", "Gold", 2026)
+
+    assert _slide_texts(content) == ["Issued to Acme & Co", "Valid through 31 December 2026"]
+
+
+@pytest.mark.parametrize("texts", [
+    ("Issued to <Company>", "<Tier>", "Valid through 31 December 2020"),
+    ("Issued to <Company>", "Valid through 31 December 2020"),
+], ids=["zip", "fallback"])
+def test_control_characters_are_encoded(texts):
+    template = _make_template(*texts)
+
+    content = modify_pptx_template(template, "Bad\x01Co", "Gold\x0b", 2026)
+
+    # The deck must stay valid XML; python-pptx raises on a corrupt slide part
+    assert _slide_texts(content)[0] == "Issued to Bad_x0001_Co"
+
+
+def test_fallback_path_updates_every_date():
+    template = _make_template(
+        "Issued to <Company>",
+        "Valid through 31 December 2020 / 31 December 2021"
+    )
+
+    content = modify_pptx_template(template, "Acme", "Gold", 2026)
+
+    assert _slide_texts(content)[1] == "Valid through 31 December 2026 / 31 December 2026"
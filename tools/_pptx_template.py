@@ -0,0 +1,325 @@
+"""
+PowerPoint certificate template fill shared by the Salesforce tools
+
+Replaces the <Company> and <Tier> placeholders and the "Valid through" date in
+a PPTX template, editing the slide XML directly and falling back to
+python-pptx when a placeholder is split across text runs.
+"""
+
+import logging
+import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+from datetime import datetime
+from io import BytesIO
+from xml.sax.saxutils import escape
+from pptx import Presentation
+from pptx.oxml.ns import qn
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Prefix of the "Valid through" date in the template; the year follows it
+_VALID_THROUGH_PREFIX = "31 December "
+_VALID_THROUGH_RE = re.compile(r'31 December \d{4}')
+
+# Slide XML tags for shape text bodies and their text nodes
+_TX_BODY_TAG = qn('p:txBody')
+_TEXT_PATH = './/' + qn('a:t')
+
+# Slide parts and the escaped placeholders as they appear in the raw slide XML
+_SLIDE_PART_RE = re.compile(r'ppt/slides/slide\d+\.xml')
+_COMPANY_TAG = b"&lt;Company&gt;"
+_TIER_TAG = b"&lt;Tier&gt;"
+_VALID_THROUGH_TAG = b"Valid through"
+_VALID_THROUGH_XML_RE = re.compile(rb'31 December \d{4}')
+_TX_BODY_XML_RE = re.compile(rb'<p:txBody>.*?</p:txBody>', re.DOTALL)
+
+# Characters XML 1.0 does not allow in text, written out as _xHHHH_ like python-pptx does
+_XML_ILLEGAL_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+# Decks with at least this many slides are processed on a thread pool
+PARALLEL_SLIDE_THRESHOLD = 4
+MAX_SLIDE_WORKERS = 8
+
+# Per-thread buffer that prs.save writes into, reused across calls
+_OUTPUT_BUFFER = threading.local()
+
+
+def _replace_in_slide(slide_element, company_name: str, tier: str, year: str) -> dict:
+    """
+    Replace the template placeholders in the XML of a single slide.
+    
+    Works on the <a:t> text nodes directly rather than through python-pptx's
+    shape/paragraph/run wrappers.
+    
+    Args:
+        slide_element: Root lxml element of the slide
+        company_name: Company name to insert
+        tier: Tier level to insert
+        year: Year to set on the Valid through date
+        
+    Returns:
+        Number of replacements made per placeholder
+    """
+    hits = {"<Company>": 0, "<Tier>": 0, "date": 0}
+    
+    # Bind loop invariants to locals
+    prefix = _VALID_THROUGH_PREFIX
+    valid_through_re = _VALID_THROUGH_RE
+    valid_through_date = prefix + year
+    text_path = _TEXT_PATH
+    
+    # Iterate through the text body of every shape on the slide
+    for tx_body in slide_element.iter(_TX_BODY_TAG):
+        t_elems = tx_body.findall(text_path)
+        
+        # Read the shape text once to decide whether the shape needs work
+        shape_text = "".join(t.text or "" for t in t_elems)
+        has_valid_through = "Valid through" in shape_text
+        
+        # Number of substitutions still expected in this shape
+        pending = shape_text.count("<Company>") + shape_text.count("<Tier>")
+        if has_valid_through:
+            pending += shape_text.count(prefix)
+        if not pending:
+            continue
+        
+        for t in t_elems:
+            original = text = t.text
+            if not text:
+                continue
+            
+            # Replace <Company> placeholder
+            count = text.count("<Company>")
+            if count:
+                pending -= count
+                text = text.replace("<Company>", company_name)
+                hits["<Company>"] += count
+            
+            # Replace <Tier> placeholder
+            count = text.count("<Tier>")
+            if count:
+                pending -= count
+                text = text.replace("<Tier>", tier)
+                hits["<Tier>"] += count
+            
+            # Update every Valid through date (find and replace old year)
+            if has_valid_through and prefix in text:
+                pending -= text.count(prefix)
+                text, count = valid_through_re.subn(valid_through_date, text)
+                hits["date"] += count
+            
+            # Only touch the XML when a replacement changed the text
+            if text != original:
+                t.text = text
+            
+            # Stop scanning once every placeholder in the shape is handled
+            if pending <= 0:
+                break
+    
+    return hits
+
+
+def _replace_placeholders(prs, company_name: str, tier: str, current_year: int) -> dict:
+    """
+    Replace the template placeholders in a loaded presentation in place.
+    
+    Every occurrence of each placeholder is replaced; within a shape the scan
+    stops once the occurrences counted up front have all been handled, and
+    shapes without placeholders are skipped. Small decks are processed slide
+    by slide, larger decks are spread across a thread pool, one task per
+    slide; each slide is its own XML part, so the tasks never touch the same
+    tree.
+    
+    Args:
+        prs: Loaded python-pptx Presentation
+        company_name: Company name to insert
+        tier: Tier level to insert
+        current_year: Year to set on the Valid through date
+        
+    Returns:
+        Number of replacements made per placeholder
+    """
+    hits = {"<Company>": 0, "<Tier>": 0, "date": 0}
+    year = str(current_year)
+    
+    # Load every slide part up front so worker threads only edit XML
+    slide_elements = [slide.element for slide in prs.slides]
+    
+    if len(slide_elements) < PARALLEL_SLIDE_THRESHOLD:
+        for slide_element in slide_elements:
+            for key, count in _replace_in_slide(slide_element, company_name, tier, year).items():
+                hits[key] += count
+        return hits
+    
+    workers = min(MAX_SLIDE_WORKERS, len(slide_elements))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_replace_in_slide, slide_element, company_name, tier, year)
+            for slide_element in slide_elements
+        ]
+        for future in futures:
+            for key, count in future.result().items():
+                hits[key] += count
+    
+    return hits
+
+
+def _xml_safe(value: str) -> str:
+    """Encode characters that XML cannot hold as _xHHHH_, as python-pptx does for run text."""
+    return _XML_ILLEGAL_CHARS_RE.sub(lambda match: "_x%04X_" % ord(match.group()), value)
+
+
+def _output_buffer() -> BytesIO:
+    """Return this thread's reusable output buffer, emptied."""
+    output_stream = getattr(_OUTPUT_BUFFER, "stream", None)
+    if output_stream is None:
+        output_stream = _OUTPUT_BUFFER.stream = BytesIO()
+    else:
+        output_stream.seek(0)
+        output_stream.truncate(0)
+    return output_stream
+
+
+def _modify_slide_xml(file_stream: BinaryIO, company_name: str, tier: str, current_year: int) -> tuple:
+    """
+    Replace the template placeholders by editing the slide XML inside the PPTX zip.
+    
+    Avoids building the python-pptx object model entirely. Placeholders are
+    only found when each one sits in a single text run of the template; the
+    caller falls back to python-pptx when a placeholder is not found.
+    
+    Args:
+        file_stream: Original PowerPoint file as a readable binary stream
+        company_name: Company name to insert
+        tier: Tier level to insert
+        current_year: Year to set on the Valid through date
+        
+    Returns:
+        Tuple of (replacements made per placeholder, modified file as bytes)
+    """
+    hits = {"<Company>": 0, "<Tier>": 0, "date": 0}
+    company = escape(company_name).encode('utf-8')
+    tier_value = escape(tier).encode('utf-8')
+    valid_through_date = b"31 December " + str(current_year).encode('ascii')
+    
+    def replace_tx_body(match):
+        tx_body = match.group(0)
+        count = tx_body.count(_COMPANY_TAG)
+        if count:
+            tx_body = tx_body.replace(_COMPANY_TAG, company)
+            hits["<Company>"] += count
+        count = tx_body.count(_TIER_TAG)
+        if count:
+            tx_body = tx_body.replace(_TIER_TAG, tier_value)
+            hits["<Tier>"] += count
+        if _VALID_THROUGH_TAG in tx_body:
+            tx_body, count = _VALID_THROUGH_XML_RE.subn(valid_through_date, tx_body)
+            hits["date"] += count
+        return tx_body
+    
+    with zipfile.ZipFile(file_stream) as src:
+        entries = src.infolist()
+        slides = {}
+        for info in entries:
+            if not _SLIDE_PART_RE.fullmatch(info.filename):
+                continue
+            data = src.read(info)
+            # Only shape text is edited, never attributes such as shape names or alt text
+            if _COMPANY_TAG in data or _TIER_TAG in data or _VALID_THROUGH_TAG in data:
+                data = _TX_BODY_XML_RE.sub(replace_tx_body, data)
+            slides[info.filename] = data
+        
+        if not all(hits.values()):
+            return hits, None
+        
+        # Repack the zip, copying every other part unchanged
+        output_stream = _output_buffer()
+        with zipfile.ZipFile(output_stream, "w") as dst:
+            for info in entries:
+                data = slides.get(info.filename)
+                dst.writestr(info, data if data is not None else src.read(info))
+    
+    with output_stream.getbuffer() as view:
+        return hits, bytes(view)
+
+
+def _modify_presentation(file_stream: BinaryIO, company_name: str, tier: str, current_year: int) -> tuple:
+    """
+    Replace the template placeholders by loading the deck with python-pptx.
+    
+    Args:
+        file_stream: Original PowerPoint file as a readable binary stream
+        company_name: Company name to insert
+        tier: Tier level to insert
+        current_year: Year to set on the Valid through date
+        
+    Returns:
+        Tuple of (replacements made per placeholder, modified file as bytes)
+    """
+    # Load the PowerPoint from the stream
+    prs = Presentation(file_stream)
+    
+    hits = _replace_placeholders(prs, company_name, tier, current_year)
+    
+    # Save modified presentation to bytes, reusing this thread's output buffer
+    output_stream = _output_buffer()
+    prs.save(output_stream)
+    with output_stream.getbuffer() as view:
+        return hits, bytes(view)
+
+
+def modify_pptx_template(
+    file_stream: BinaryIO,
+    company_name: str,
+    tier: str,
+    current_year: Optional[int] = None
+) -> bytes:
+    """
+    Modify PowerPoint template by replacing placeholders and updating valid through date.
+    
+    Args:
+        file_stream: Original PowerPoint file as a readable binary stream
+        company_name: Company name to insert
+        tier: Tier level to insert
+        current_year: Year to set on the Valid through date (defaults to the current year)
+        
+    Returns:
+        Modified PowerPoint file as bytes
+    """
+    try:
+        # Calculate the valid through date (31 December of current year)
+        if current_year is None:
+            current_year = datetime.now().year
+        valid_through_date = f"31 December {current_year}"
+        
+        logger.info(
+            "Modifying template: Company=%s, Tier=%s, Valid through=%s",
+            company_name, tier, valid_through_date
+        )
+        
+        # Both paths write the values straight into the slide XML
+        company_name = _xml_safe(company_name)
+        tier = _xml_safe(tier)
+        
+        # Edit the slide XML directly, falling back to python-pptx if a placeholder is missed
+        hits, modified_content = _modify_slide_xml(file_stream, company_name, tier, current_year)
+        if modified_content is None:
+            logger.info("Not every placeholder found in the slide XML, using python-pptx")
+            file_stream.seek(0)
+            hits, modified_content = _modify_presentation(file_stream, company_name, tier, current_year)
+        
+        logger.info(
+            "Replaced <Company> %d times, <Tier> %d times, Valid through date %d times",
+            hits["<Company>"], hits["<Tier>"], hits["date"]
+        )
+        
+        logger.info("Successfully modified PowerPoint template (%d bytes)", len(modified_content))
+        return modified_content
+        
+    except Exception as e:
+        logger.error("Error modifying PowerPoint template: %s", e)
+        raise
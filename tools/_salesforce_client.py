@@ -0,0 +1,258 @@
+"""
+Shared Salesforce client for the watsonx Orchestrate file tools
+
+Holds the HTTP session, credential lookup and download logic used by the
+Salesforce tools so they are set up once per process.
+"""
+
+import json
+import logging
+import shutil
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from io import BytesIO
+
+# Connections - will be provided by watsonx orchestrate at runtime
+try:
+    from ibm_watsonx_orchestrate.run import connections
+except ImportError:
+    connections = None
+
+# Faster JSON encoding and decoding when orjson is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Salesforce connection configuration
+SALESFORCE_APP_ID = 'salesforce-wxo'
+SALESFORCE_API_VERSION = 'v58.0'
+REQUEST_TIMEOUT = 60
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# SOQL used to resolve a ContentDocument ID to its latest ContentVersion
+_CONTENT_VERSION_QUERY = (
+    "SELECT Id FROM ContentVersion "
+    "WHERE ContentDocumentId = '{}' AND IsLatest = true"
+)
+
+# Connect files responses that make a ContentDocument download fall back to VersionData
+_CONNECT_FALLBACK_STATUSES = (403, 404, 503)
+
+# HTTP session shared by the tools so their Salesforce calls reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504]
+        )
+    )
+)
+
+
+def escape_soql(value: str) -> str:
+    """Escape a value for use inside a single-quoted SOQL string literal."""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def dump_json(obj) -> bytes:
+    """Encode an object as a JSON body, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def parse_json(response: requests.Response):
+    """Decode a JSON response body, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def get_credentials() -> tuple:
+    """
+    Return the Salesforce base URL and access token of the calling user.
+    
+    The connection is OAuth2 authorization code, so the credentials belong to
+    the user of the current tool invocation and are resolved on every call
+    rather than shared across invocations in the same process.
+    
+    Returns:
+        Tuple of (base_url, access_token)
+    """
+    creds = connections.oauth2_auth_code(SALESFORCE_APP_ID)
+    return creds.url.rstrip('/'), creds.access_token
+
+
+def _latest_version_url(base_url: str, content_document_id: str, headers: dict) -> str:
+    """
+    Query the latest ContentVersion of a ContentDocument and build its download URL.
+    
+    Args:
+        base_url: Salesforce instance URL
+        content_document_id: ContentDocument ID (069)
+        headers: Authorization headers for the request
+    
+    Returns:
+        VersionData URL of the latest ContentVersion
+    """
+    query = _CONTENT_VERSION_QUERY.format(escape_soql(content_document_id))
+    query_url = f"{base_url}/services/data/{SALESFORCE_API_VERSION}/query"
+    
+    query_response = SESSION.get(
+        query_url,
+        headers=headers,
+        params={"q": query},
+        timeout=REQUEST_TIMEOUT
+    )
+    query_response.raise_for_status()
+    
+    query_data = parse_json(query_response)
+    
+    if not query_data.get('records'):
+        raise ValueError(
+            f"No file found with ContentDocument ID: {content_document_id}"
+        )
+    
+    # Get the ContentVersion ID
+    content_version_id = query_data['records'][0]['Id']
+    logger.info("Found ContentVersion ID: %s", content_version_id)
+    
+    return (
+        f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
+        f"sobjects/ContentVersion/{content_version_id}/VersionData"
+    )
+
+
+def _content_document_url(base_url: str, file_id: str) -> tuple:
+    """Build the download URL for a ContentDocument ID (069)."""
+    logger.info("ContentDocument ID detected: %s", file_id)
+    
+    # Connect files endpoint serves the latest version in a single request
+    download_url = (
+        f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
+        f"connect/files/{file_id}/content"
+    )
+    return download_url, file_id
+
+
+def _content_version_url(base_url: str, file_id: str) -> tuple:
+    """Build the download URL for a ContentVersion ID (068)."""
+    logger.info("ContentVersion ID detected: %s", file_id)
+    download_url = (
+        f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
+        f"sobjects/ContentVersion/{file_id}/VersionData"
+    )
+    return download_url, None
+
+
+def _attachment_url(base_url: str, file_id: str) -> tuple:
+    """Build the download URL for an Attachment ID (00P)."""
+    logger.info("Attachment ID detected: %s", file_id)
+    download_url = (
+        f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
+        f"sobjects/Attachment/{file_id}/Body"
+    )
+    return download_url, None
+
+
+# Download URL builders keyed by ID prefix; each returns (download_url, content_document_id)
+_PREFIX_HANDLERS = {
+    '069': _content_document_url,
+    '068': _content_version_url,
+    '00P': _attachment_url,
+}
+
+
+def download_file(file_id: str) -> BytesIO:
+    """
+    Download a file from Salesforce into an in-memory buffer.
+    
+    Supports ContentDocument (069), ContentVersion (068) and Attachment (00P) IDs.
+    
+    Args:
+        file_id: The Salesforce file ID
+    
+    Returns:
+        Buffer holding the file content, positioned at the start
+    """
+    # Validate file ID
+    if not file_id:
+        raise ValueError("file_id cannot be empty")
+    
+    base_url, access_token = get_credentials()
+    return _download_file(base_url, access_token, file_id)
+
+
+def _download_file(base_url: str, access_token: str, file_id: str) -> BytesIO:
+    """Download a file from Salesforce with the given credentials."""
+    # Prepare authorization headers
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "*/*"
+    }
+    
+    # Dispatch on the 3-character key prefix of the ID
+    handler = _PREFIX_HANDLERS.get(file_id[:3])
+    if handler is None:
+        raise ValueError(
+            f"Unknown Salesforce ID format: {file_id}. "
+            f"Expected ContentDocument (069), ContentVersion (068), "
+            f"or Attachment (00P)"
+        )
+    
+    # content_document_id is set when the download goes through the Connect files endpoint
+    download_url, content_document_id = handler(base_url, file_id)
+    
+    # Download the file with streaming for large files
+    logger.info("Downloading file from: %s", download_url)
+    
+    try:
+        response = SESSION.get(
+            download_url,
+            headers=headers,
+            timeout=REQUEST_TIMEOUT,
+            stream=True
+        )
+    except requests.exceptions.RetryError:
+        # Retries exhausted on a rate-limit or server error status
+        if not content_document_id:
+            raise
+        response = None
+    
+    # Connect API can be disabled for the org or over its hourly rate limit (503);
+    # resolve the ContentVersion instead
+    if content_document_id and (response is None or response.status_code in _CONNECT_FALLBACK_STATUSES):
+        if response is not None:
+            response.close()
+        logger.info("Connect files endpoint unavailable, querying latest ContentVersion")
+        download_url = _latest_version_url(base_url, content_document_id, headers)
+        logger.info("Downloading file from: %s", download_url)
+        response = SESSION.get(
+            download_url,
+            headers=headers,
+            timeout=REQUEST_TIMEOUT,
+            stream=True
+        )
+    
+    # Raise exception for HTTP errors
+    response.raise_for_status()
+    
+    # Stream the file content into a buffer, letting urllib3 undo any gzip encoding
+    file_stream = BytesIO()
+    response.raw.decode_content = True
+    shutil.copyfileobj(response.raw, file_stream, length=DOWNLOAD_CHUNK_SIZE)
+    file_size = file_stream.tell()
+    file_stream.seek(0)
+    
+    logger.info("Successfully retrieved file (%d bytes)", file_size)
+    return file_stream
@@ -5,16 +5,14 @@ This tool retrieves files from Salesforce and returns them as bytes for download
 """
 
 import logging
-import requests
-from requests.exceptions import RequestException, Timeout, HTTPError
 from pydantic import BaseModel, Field
-from typing import Literal, Optional
+
+from _salesforce_client import SALESFORCE_APP_ID, download_file
 
 # Tool decorator - will be provided by watsonx orchestrate at runtime
 try:
     from ibm_watsonx_orchestrate.agent_builder.tools import tool
     from ibm_watsonx_orchestrate.agent_builder.connections import ConnectionType
-    from ibm_watsonx_orchestrate.run import connections
 except ImportError:
     # Fallback for local testing
     def tool(*args, **kwargs):
@@ -28,11 +26,6 @@ except ImportError:
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Salesforce connection configuration
-SALESFORCE_APP_ID = 'salesforce-wxo'
-SALESFORCE_API_VERSION = 'v58.0'
-REQUEST_TIMEOUT = 60
-
 
 class SalesforceFileInput(BaseModel):
     """Input model for Salesforce file download"""
@@ -74,102 +67,8 @@ def salesforce_download_file(input_data: SalesforceFileInput) -> bytes:
         # Extract file ID from input
         file_id = input_data.file_id.strip()
         
-        # Validate file ID
-        if not file_id:
-            raise ValueError("file_id cannot be empty")
-        
-        # Get OAuth2 credentials from the connection
-        creds = connections.oauth2_auth_code(SALESFORCE_APP_ID)
-
-        base_url = creds.url.rstrip('/')
-        
-        # Prepare authorization headers
-        headers = {
-            "Authorization": f"Bearer {creds.access_token}",
-            "Accept": "*/*"
-        }
-        
-        # Handle ContentDocument ID (069) - need to get ContentVersion ID first
-        if file_id.startswith('069'):
-            logger.info(f"ContentDocument ID detected: {file_id}")
-            
-            # Query for the latest ContentVersion
-            query = (
-                f"SELECT Id FROM ContentVersion "
-                f"WHERE ContentDocumentId = '{file_id}' AND IsLatest = true"
-            )
-            query_url = f"{ base_url}/services/data/{SALESFORCE_API_VERSION}/query"
-            
-            query_response = requests.get(
-                query_url, 
-                headers=headers, 
-                params={"q": query}, 
-                timeout=REQUEST_TIMEOUT
-            )
-            query_response.raise_for_status()
-            
-            query_data = query_response.json()
-            
-            if not query_data.get('records'):
-                raise ValueError(
-                    f"No file found with ContentDocument ID: {file_id}"
-                )
-            
-            # Get the ContentVersion ID
-            content_version_id = query_data['records'][0]['Id']
-            file_id = content_version_id
-            logger.info(f"Found ContentVersion ID: {file_id}")
-            
-            # Set download URL for ContentVersion
-            download_url = (
-                f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
-                f"sobjects/ContentVersion/{file_id}/VersionData"
-            )
-        
-        # Handle ContentVersion ID (068)
-        elif file_id.startswith('068'):
-            logger.info(f"ContentVersion ID detected: {file_id}")
-            download_url = (
-                f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
-                f"sobjects/ContentVersion/{file_id}/VersionData"
-            )
-        
-        # Handle Attachment ID (00P)
-        elif file_id.startswith('00P'):
-            logger.info(f"Attachment ID detected: {file_id}")
-            download_url = (
-                f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
-                f"sobjects/Attachment/{file_id}/Body"
-            )
-        
-        else:
-            raise ValueError(
-                f"Unknown Salesforce ID format: {file_id}. "
-                f"Expected ContentDocument (069), ContentVersion (068), "
-                f"or Attachment (00P)"
-            )
-        
-        # Download the file with streaming for large files
-        logger.info(f"Downloading file from: {download_url}")
-        
-        response = requests.get(
-            download_url,
-            headers=headers,
-            timeout=REQUEST_TIMEOUT,
-            stream=True
-        )
-        
-        # Raise exception for HTTP errors
-        response.raise_for_status()
-        
-        # Get file content as bytes
-        file_content = response.content
-        file_size = len(file_content)
-        
-        logger.info(f"Successfully retrieved file ({file_size} bytes)")
-        
-        # Return bytes for download
-        return file_content
+        # Download the file and return its bytes
+        return download_file(file_id).getvalue()
         
     except Exception as e:
         # Return error message as bytes (text file)
@@ -6,20 +6,30 @@ uploads the modified file back to Salesforce, and returns the file as bytes.
 """
 
 import logging
-import requests
-from requests.exceptions import RequestException, Timeout, HTTPError
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, Field
-from typing import Literal, Optional
-from datetime import datetime
+from typing import BinaryIO, List, Optional
 from io import BytesIO
-from pptx import Presentation
-import mimetypes
+
+from _pptx_template import modify_pptx_template
+from _salesforce_client import (
+    REQUEST_TIMEOUT,
+    SALESFORCE_API_VERSION,
+    SALESFORCE_APP_ID,
+    SESSION,
+    download_file,
+    dump_json,
+    get_credentials,
+    escape_soql,
+    parse_json
+)
 
 # Tool decorator - will be provided by watsonx orchestrate at runtime
 try:
     from ibm_watsonx_orchestrate.agent_builder.tools import tool
     from ibm_watsonx_orchestrate.agent_builder.connections import ConnectionType
-    from ibm_watsonx_orchestrate.run import connections
 except ImportError:
     # Fallback for local testing
     def tool(*args, **kwargs):
@@ -33,10 +43,28 @@ except ImportError:
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Salesforce connection configuration
-SALESFORCE_APP_ID = 'salesforce-wxo'
-SALESFORCE_API_VERSION = 'v58.0'
-REQUEST_TIMEOUT = 60
+# SOQL used to find the ContentDocument of an uploaded ContentVersion
+_CONTENT_DOCUMENT_QUERY = "SELECT ContentDocumentId FROM ContentVersion WHERE Id = '{}'"
+
+# Concurrent uploads per batch run; each one holds a pooled session connection
+MAX_UPLOAD_WORKERS = 4
+
+# Characters not allowed in certificate file names inside the batch archive
+_UNSAFE_NAME_RE = re.compile(r'[^\w.-]+')
+
+
+class RecipientInput(BaseModel):
+    """Company and tier for one certificate in a batch run"""
+    company_name: str = Field(
+        description="Company name to replace <Company> placeholder in the template"
+    )
+    tier: str = Field(
+        description="Tier level to replace <Tier> placeholder (e.g., Silver, Gold, Platinum)"
+    )
+    title: str = Field(
+        default="Partner_Plus_Certificate",
+        description="Title for the uploaded file in Salesforce"
+    )
 
 
 class SalesforceFileInput(BaseModel):
@@ -61,66 +89,39 @@ class SalesforceFileInput(BaseModel):
         default="Partner_Plus_Certificate",
         description="Title for the uploaded file in Salesforce"
     )
+    recipients: Optional[List[RecipientInput]] = Field(
+        default=None,
+        description="Optional list of certificates to generate from the same template in one run. "
+                    "When set, company_name, tier and title are ignored and a zip of all certificates is returned"
+    )
 
 
-def modify_pptx_template(file_content: bytes, company_name: str, tier: str) -> bytes:
+def lookup_content_document_id(base_url: str, access_token: str, content_version_id: str) -> Optional[str]:
     """
-    Modify PowerPoint template by replacing placeholders and updating valid through date.
+    Look up the ContentDocument ID of a ContentVersion.
     
     Args:
-        file_content: Original PowerPoint file as bytes
-        company_name: Company name to insert
-        tier: Tier level to insert
+        base_url: Salesforce instance URL
+        access_token: OAuth2 access token
+        content_version_id: ContentVersion ID (068)
         
     Returns:
-        Modified PowerPoint file as bytes
+        The ContentDocument ID, or None if the ContentVersion was not found
     """
-    try:
-        # Load the PowerPoint from bytes
-        prs = Presentation(BytesIO(file_content))
-        
-        # Calculate the valid through date (31 December of current year)
-        current_year = datetime.now().year
-        valid_through_date = f"31 December {current_year}"
-        
-        logger.info(f"Modifying template: Company={company_name}, Tier={tier}, Valid through={valid_through_date}")
-        
-        # Iterate through all slides
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text_frame"):
-                    # Process each paragraph and run
-                    for paragraph in shape.text_frame.paragraphs:
-                        for run in paragraph.runs:
-                            # Replace <Company> placeholder
-                            if "<Company>" in run.text:
-                                run.text = run.text.replace("<Company>", company_name)
-                                logger.info(f"Replaced <Company> with {company_name}")
-                            
-                            # Replace <Tier> placeholder
-                            if "<Tier>" in run.text:
-                                run.text = run.text.replace("<Tier>", tier)
-                                logger.info(f"Replaced <Tier> with {tier}")
-                            
-                            # Update the Valid through date (find and replace old year)
-                            if "31 December" in run.text and "Valid through" in shape.text:
-                                # Replace any year pattern (20XX or 19XX)
-                                import re
-                                run.text = re.sub(r'31 December \d{4}', valid_through_date, run.text)
-                                logger.info(f"Updated Valid through date to {valid_through_date}")
-        
-        # Save modified presentation to bytes
-        output_stream = BytesIO()
-        prs.save(output_stream)
-        output_stream.seek(0)
-        modified_content = output_stream.read()
-        
-        logger.info(f"Successfully modified PowerPoint template ({len(modified_content)} bytes)")
-        return modified_content
-        
-    except Exception as e:
-        logger.error(f"Error modifying PowerPoint template: {str(e)}")
-        raise
+    query = _CONTENT_DOCUMENT_QUERY.format(escape_soql(content_version_id))
+    query_url = f"{base_url}/services/data/{SALESFORCE_API_VERSION}/query"
+    query_response = SESSION.get(
+        query_url,
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"q": query},
+        timeout=REQUEST_TIMEOUT
+    )
+    query_response.raise_for_status()
+    query_data = parse_json(query_response)
+    
+    if query_data.get('records'):
+        return query_data['records'][0]['ContentDocumentId']
+    return None
 
 
 def upload_file_to_salesforce(
@@ -147,20 +148,15 @@ def upload_file_to_salesforce(
         # Prepare the file upload
         upload_url = f"{base_url}/services/data/{SALESFORCE_API_VERSION}/sobjects/ContentVersion"
         
+        # Content-Type (with the multipart boundary) is set by requests
         headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
+            "Authorization": f"Bearer {access_token}"
         }
         
-        # Encode file content to base64
-        import base64
-        encoded_file = base64.b64encode(file_content).decode('utf-8')
-        
-        # Prepare the payload
+        # Prepare the payload; VersionData is sent as a separate binary part
         payload = {
             "Title": title,
             "PathOnClient": f"{title}.pptx",
-            "VersionData": encoded_file,
             "IsMajorVersion": True
         }
         
@@ -171,37 +167,27 @@ def upload_file_to_salesforce(
         else:
             logger.info("Creating new ContentDocument")
         
-        # Upload the file
+        # Upload the file as multipart/form-data to avoid base64-encoding it
         logger.info(f"Uploading file to Salesforce: {title}")
-        response = requests.post(
+        response = SESSION.post(
             upload_url,
             headers=headers,
-            json=payload,
+            files={
+                "entity_content": (None, dump_json(payload), "application/json"),
+                "VersionData": (f"{title}.pptx", file_content, "application/octet-stream")
+            },
             timeout=REQUEST_TIMEOUT
         )
         
         response.raise_for_status()
-        upload_result = response.json()
+        upload_result = parse_json(response)
         
         if upload_result.get('success'):
             content_version_id = upload_result['id']
             logger.info(f"Successfully uploaded file. ContentVersion ID: {content_version_id}")
             
             # Query to get the ContentDocument ID
-            query = f"SELECT ContentDocumentId FROM ContentVersion WHERE Id = '{content_version_id}'"
-            query_url = f"{base_url}/services/data/{SALESFORCE_API_VERSION}/query"
-            query_response = requests.get(
-                query_url,
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"q": query},
-                timeout=REQUEST_TIMEOUT
-            )
-            query_response.raise_for_status()
-            query_data = query_response.json()
-            
-            content_document_id = None
-            if query_data.get('records'):
-                content_document_id = query_data['records'][0]['ContentDocumentId']
+            content_document_id = lookup_content_document_id(base_url, access_token, content_version_id)
             
             return {
                 "success": True,
@@ -218,6 +204,139 @@ def upload_file_to_salesforce(
         raise
 
 
+def _certificate_title(company_name: str, tier: str, title: str) -> str:
+    """Return the Salesforce title for a certificate, making the default title unique."""
+    # Generate dynamic title based on company and tier
+    if title == "Partner_Plus_Certificate":
+        # Create unique title with company and tier
+        safe_company = company_name.replace(" ", "_").replace("/", "_")
+        return f"Partner_Plus_Certificate_{tier}_{safe_company}"
+    return title
+
+
+def _upload_certificate(base_url: str, access_token: str, file_content: bytes, title: str) -> dict:
+    """
+    Upload a certificate as a new ContentDocument and log its IDs.
+    
+    Returns:
+        Upload details including ContentVersion ID and ContentDocument ID
+    """
+    # NOTE: We pass None for original_content_document_id to create a NEW document
+    # instead of creating a new version of the template
+    upload_result = upload_file_to_salesforce(
+        base_url,
+        access_token,
+        file_content=file_content,
+        title=title,
+        original_content_document_id=None  # Always create new document
+    )
+    
+    logger.info(f"Upload successful! ContentVersion ID: {upload_result['content_version_id']}, "
+               f"ContentDocument ID: {upload_result['content_document_id']}")
+    
+    # Log the Salesforce IDs for the agent to potentially use
+    print(f"SALESFORCE_UPLOAD_INFO: ContentVersion={upload_result['content_version_id']}, "
+          f"ContentDocument={upload_result['content_document_id']}")
+    return upload_result
+
+
+def _archive_entry_name(title: str, used_names: set) -> str:
+    """Return a safe, unique .pptx entry name for a certificate title."""
+    # Keep the name a single plain path component
+    base = _UNSAFE_NAME_RE.sub("_", title).strip("._") or "certificate"
+    name = f"{base}.pptx"
+    suffix = 2
+    while name in used_names:
+        name = f"{base}_{suffix}.pptx"
+        suffix += 1
+    used_names.add(name)
+    return name
+
+
+def _build_certificate_archive(
+    file_stream: BinaryIO,
+    recipients: List[RecipientInput],
+    upload_back: bool
+) -> bytes:
+    """
+    Generate one certificate per recipient from a single downloaded template.
+    
+    Each certificate is uploaded as soon as it is generated, so uploads overlap
+    with modifying the next one. Salesforce's composite APIs cannot carry
+    binary ContentVersion data, so uploads are separate requests sharing the
+    pooled session. A certificate that fails to generate or upload does not
+    stop the run; the outcome for every recipient is written to
+    certificate_results.json in the archive.
+    
+    Args:
+        file_stream: Downloaded template as a seekable binary stream
+        recipients: Company, tier and title for each certificate
+        upload_back: If True, upload every certificate to Salesforce
+        
+    Returns:
+        Zip archive (as bytes) holding one .pptx per generated certificate
+    """
+    archive = BytesIO()
+    used_names = set()
+    
+    # (result, upload future) per recipient, in input order
+    outcomes = []
+    
+    # Resolve the caller's credentials here; worker threads only make HTTP requests
+    if upload_back:
+        base_url, access_token = get_credentials()
+    
+    with ThreadPoolExecutor(max_workers=MAX_UPLOAD_WORKERS) as executor, \
+            zipfile.ZipFile(archive, 'w') as zf:
+        for recipient in recipients:
+            company_name = recipient.company_name.strip()
+            tier = recipient.tier.strip()
+            title = _certificate_title(company_name, tier, recipient.title.strip())
+            result = {"file": None, "title": title}
+            
+            try:
+                file_stream.seek(0)
+                modified_content = modify_pptx_template(file_stream, company_name, tier)
+            except Exception as e:
+                logger.error(f"Error generating certificate {title}: {str(e)}")
+                result.update(success=False, error=str(e))
+                outcomes.append((result, None))
+                continue
+            
+            # .pptx files are already deflated, so store them as-is
+            result["file"] = _archive_entry_name(title, used_names)
+            zf.writestr(result["file"], modified_content, compress_type=zipfile.ZIP_STORED)
+            
+            future = None
+            if upload_back:
+                future = executor.submit(
+                    _upload_certificate, base_url, access_token, modified_content, title
+                )
+            outcomes.append((result, future))
+        
+        # Record every outcome so the caller knows which certificates are in Salesforce
+        results = []
+        for result, future in outcomes:
+            if future is not None:
+                try:
+                    upload_result = future.result()
+                    result.update(
+                        success=True,
+                        content_version_id=upload_result['content_version_id'],
+                        content_document_id=upload_result['content_document_id']
+                    )
+                except Exception as e:
+                    logger.error(f"Error uploading {result['title']} to Salesforce: {str(e)}")
+                    result.update(success=False, error=str(e))
+            elif "success" not in result:
+                result["success"] = True
+            results.append(result)
+        zf.writestr("certificate_results.json", dump_json(results))
+    
+    logger.info(f"Generated {len(used_names)} of {len(recipients)} certificates ({archive.tell()} bytes)")
+    return archive.getvalue()
+
+
 @tool(
     expected_credentials=[
         {"app_id": SALESFORCE_APP_ID, "type": ConnectionType.OAUTH2_AUTH_CODE}
@@ -239,13 +358,17 @@ def salesforce_download_file(input_data: SalesforceFileInput) -> bytes:
     5. Upload the modified certificate back to Salesforce (if upload_back_to_salesforce is True)
     6. Return the modified file as bytes for download
     
+    When recipients is set, the template is downloaded once and steps 2-5 run for
+    each recipient; a zip archive of all certificates is returned instead, with
+    certificate_results.json listing the outcome for each recipient.
+    
     The tool will log upload information (ContentVersion ID and ContentDocument ID) if upload is enabled.
     
     Args:
-        input_data: Contains file_id, company_name, tier, upload_back_to_salesforce, and title
+        input_data: Contains file_id, company_name, tier, upload_back_to_salesforce, title and optional recipients
         
     Returns:
-        bytes: The modified certificate file as bytes for download
+        bytes: The modified certificate file (or zip of certificates) as bytes for download
     """
     
     try:
@@ -256,131 +379,26 @@ def salesforce_download_file(input_data: SalesforceFileInput) -> bytes:
         upload_back = input_data.upload_back_to_salesforce
         title = input_data.title.strip()
         
-        # Validate file ID
-        if not file_id:
-            raise ValueError("file_id cannot be empty")
-        
-        # Get OAuth2 credentials from the connection
-        creds = connections.oauth2_auth_code(SALESFORCE_APP_ID)
-        base_url = creds.url.rstrip('/')
-        
-        # Prepare authorization headers
-        headers = {
-            "Authorization": f"Bearer {creds.access_token}",
-            "Accept": "*/*"
-        }
+        # Download the template; ContentDocument IDs are fetched in a single request
+        file_stream = download_file(file_id)
         
-        # Track the original ContentDocument ID for creating new version
-        original_content_document_id = None
-        
-        # Handle ContentDocument ID (069) - need to get ContentVersion ID first
-        if file_id.startswith('069'):
-            logger.info(f"ContentDocument ID detected: {file_id}")
-            original_content_document_id = file_id
-            
-            # Query for the latest ContentVersion
-            query = (
-                f"SELECT Id FROM ContentVersion "
-                f"WHERE ContentDocumentId = '{file_id}' AND IsLatest = true"
-            )
-            query_url = f"{base_url}/services/data/{SALESFORCE_API_VERSION}/query"
-            
-            query_response = requests.get(
-                query_url, 
-                headers=headers, 
-                params={"q": query}, 
-                timeout=REQUEST_TIMEOUT
-            )
-            query_response.raise_for_status()
-            
-            query_data = query_response.json()
-            
-            if not query_data.get('records'):
-                raise ValueError(
-                    f"No file found with ContentDocument ID: {file_id}"
-                )
-            
-            # Get the ContentVersion ID
-            content_version_id = query_data['records'][0]['Id']
-            file_id = content_version_id
-            logger.info(f"Found ContentVersion ID: {file_id}")
-            
-            # Set download URL for ContentVersion
-            download_url = (
-                f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
-                f"sobjects/ContentVersion/{file_id}/VersionData"
-            )
-        
-        # Handle ContentVersion ID (068)
-        elif file_id.startswith('068'):
-            logger.info(f"ContentVersion ID detected: {file_id}")
-            download_url = (
-                f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
-                f"sobjects/ContentVersion/{file_id}/VersionData"
-            )
-        
-        # Handle Attachment ID (00P)
-        elif file_id.startswith('00P'):
-            logger.info(f"Attachment ID detected: {file_id}")
-            download_url = (
-                f"{base_url}/services/data/{SALESFORCE_API_VERSION}/"
-                f"sobjects/Attachment/{file_id}/Body"
-            )
-        
-        else:
-            raise ValueError(
-                f"Unknown Salesforce ID format: {file_id}. "
-                f"Expected ContentDocument (069), ContentVersion (068), "
-                f"or Attachment (00P)"
-            )
-        
-        # Download the file with streaming for large files
-        logger.info(f"Downloading file from: {download_url}")
-        
-        response = requests.get(
-            download_url,
-            headers=headers,
-            timeout=REQUEST_TIMEOUT,
-            stream=True
-        )
-        
-        # Raise exception for HTTP errors
-        response.raise_for_status()
-        
-        # Get file content as bytes
-        file_content = response.content
-        file_size = len(file_content)
-        
-        logger.info(f"Successfully retrieved file ({file_size} bytes)")
+        # Batch run: reuse the downloaded template for every recipient
+        if input_data.recipients:
+            return _build_certificate_archive(file_stream, input_data.recipients, upload_back)
         
         # Modify the PowerPoint template
-        modified_content = modify_pptx_template(file_content, company_name, tier)
-        
-        # Generate dynamic title based on company and tier
-        if title == "Partner_Plus_Certificate":
-            # Create unique title with company and tier
-            safe_company = company_name.replace(" ", "_").replace("/", "_")
-            dynamic_title = f"Partner_Plus_Certificate_{tier}_{safe_company}"
-        else:
-            dynamic_title = title
+        modified_content = modify_pptx_template(file_stream, company_name, tier)
         
         # Upload back to Salesforce if requested
-        # NOTE: We pass None for original_content_document_id to create a NEW document
-        # instead of creating a new version of the template
         if upload_back:
-            upload_result = upload_file_to_salesforce(
-                base_url=base_url,
-                access_token=creds.access_token,
-                file_content=modified_content,
-                title=dynamic_title,
-                original_content_document_id=None  # Always create new document
+            # Uses the caller's OAuth2 credentials
+            base_url, access_token = get_credentials()
+            _upload_certificate(
+                base_url,
+                access_token,
+                modified_content,
+                _certificate_title(company_name, tier, title)
             )
-            logger.info(f"Upload successful! ContentVersion ID: {upload_result.get('content_version_id')}, "
-                       f"ContentDocument ID: {upload_result.get('content_document_id')}")
-            
-            # Log the Salesforce IDs for the agent to potentially use
-            print(f"SALESFORCE_UPLOAD_INFO: ContentVersion={upload_result.get('content_version_id')}, "
-                  f"ContentDocument={upload_result.get('content_document_id')}")
         
         # Return the modified file bytes for download
         return modified_content